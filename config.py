@@ -1,30 +1,43 @@
 import os
+from functools import lru_cache
+from types import SimpleNamespace
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+@lru_cache(maxsize=1)
+def _load():
+    """Load environment variables (once) and read the configuration values."""
+    load_dotenv()
+    return SimpleNamespace(
+        # Twilio configuration
+        TWILIO_SID=os.getenv('TWILIO_SID'),
+        TWILIO_TOKEN=os.getenv('TWILIO_TOKEN'),
+        TWILIO_FROM=os.getenv('TWILIO_FROM'),
+        MY_PHONE=os.getenv('MY_PHONE'),
 
-# Twilio configuration
-TWILIO_SID = os.getenv('TWILIO_SID')
-TWILIO_TOKEN = os.getenv('TWILIO_TOKEN')
-TWILIO_FROM = os.getenv('TWILIO_FROM')
-MY_PHONE = os.getenv('MY_PHONE')
+        # CrossFit configuration
+        CROSSFIT_URL=os.getenv('CROSSFIT_URL', 'https://www.crossfit.com/wod'),
 
-# CrossFit configuration
-CROSSFIT_URL = os.getenv('CROSSFIT_URL', 'https://www.crossfit.com/wod')
+        # Scheduling configuration
+        SEND_TIME=os.getenv('SEND_TIME', '07:00'),
+    )
 
-# Scheduling configuration  
-SEND_TIME = os.getenv('SEND_TIME', '07:00')
+def __getattr__(name):
+    """Resolve config values lazily so `from config import X` loads .env on first use."""
+    # Import machinery probes dunders like __path__; answering those must not load .env
+    if name.startswith('__'):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    config = _load()
+    if hasattr(config, name):
+        return getattr(config, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def validate_config():
     """Validate that all required configuration is present."""
-    required_vars = [TWILIO_SID, TWILIO_TOKEN, TWILIO_FROM, MY_PHONE]
-    missing = [name for name, value in zip(
-        ['TWILIO_SID', 'TWILIO_TOKEN', 'TWILIO_FROM', 'MY_PHONE'], 
-        required_vars
-    ) if not value]
-    
+    config = _load()
+    required = ['TWILIO_SID', 'TWILIO_TOKEN', 'TWILIO_FROM', 'MY_PHONE']
+    missing = [name for name in required if not getattr(config, name)]
+
     if missing:
         raise ValueError(f"Missing required environment variables: {', '.join(missing)}")
-    
-    return True
\ No newline at end of file
+
+    return True
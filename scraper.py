@@ -1,188 +1,359 @@
+import ahocorasick
 import requests
-from bs4 import BeautifulSoup
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup, Tag
+from bs4.element import Comment, Declaration, Doctype, ProcessingInstruction
 from datetime import datetime
+from html import unescape
+from itertools import islice
 import logging
+import re
 import time
-from config import CROSSFIT_URL
+import config
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def fetch_wod_html(max_retries=3, delay=1):
-    """Fetch the HTML content from CrossFit WOD page with retry logic."""
-    for attempt in range(max_retries):
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(CROSSFIT_URL, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            # Basic content validation
-            if len(response.text) < 1000:
-                logger.warning(f"Response seems too short ({len(response.text)} chars), might be blocked")
-                if attempt < max_retries - 1:
-                    time.sleep(delay * (attempt + 1))  # Exponential backoff
-                    continue
-            
-            logger.info(f"Successfully fetched WOD page: {CROSSFIT_URL}")
-            return response.text
-            
-        except requests.exceptions.Timeout:
-            logger.warning(f"Timeout on attempt {attempt + 1}/{max_retries}")
-            if attempt < max_retries - 1:
-                time.sleep(delay * (attempt + 1))
-        except requests.exceptions.RequestException as e:
-            logger.warning(f"Request failed on attempt {attempt + 1}/{max_retries}: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(delay * (attempt + 1))
+# Shared session so repeated fetches and retries reuse pooled keep-alive connections
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    # Ask for a compressed body; includes br/zstd only when urllib3 can decode them
+    'Accept-Encoding': requests.utils.DEFAULT_ACCEPT_ENCODING,
+})
+
+# Retry with exponential backoff inside the transport layer (honours Retry-After)
+_RETRY = Retry(
+    total=3,
+    backoff_factor=1,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=["GET"],
+    respect_retry_after_header=True,
+)
+_SESSION.mount('https://', requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=_RETRY))
+
+# Parsed WODs keyed by calendar day: {"YYYY-MM-DD": (fetched_at, etag, wod)}
+_WOD_CACHE = {}
+WOD_CACHE_TTL = 3600  # seconds
+
+# Everything after the main content region (sidebar, footer, scripts) is never parsed
+_CONTENT_START_RE = re.compile(rb'<main[\s>]', re.IGNORECASE)
+_CONTENT_END = b'</main>'
+
+def _read_wod_body(response, chunk_size=8192):
+    """Read the streamed body up to the end of the main content region, then stop downloading.
     
-    # If we get here, all retries failed
-    logger.error(f"Failed to fetch WOD page after {max_retries} attempts")
-    raise requests.exceptions.RequestException(f"Failed after {max_retries} retries")
+    A '</main>' seen before the first '<main' tag (e.g. inside a script in <head>) is ignored;
+    without a main region the whole body is read.
+    """
+    body = bytearray()
+    content_start = None
+    try:
+        for chunk in response.iter_content(chunk_size):
+            # Re-scan the tail of the previous chunk in case a marker straddles the boundary
+            search_from = max(0, len(body) - len(_CONTENT_END))
+            body += chunk
+            if content_start is None:
+                match = _CONTENT_START_RE.search(body, search_from)
+                if not match:
+                    continue
+                content_start = match.end()
+            end = body.find(_CONTENT_END, max(search_from, content_start))
+            if end != -1:
+                del body[end + len(_CONTENT_END):]
+                break
+    finally:
+        response.close()
+    # CrossFit serves UTF-8; decode directly rather than trusting a header-derived (or guessed) charset
+    return body.decode('utf-8', errors='replace')
 
-def parse_wod(html):
-    """Parse the WOD content from HTML."""
-    soup = BeautifulSoup(html, 'html.parser')
+def _fetch_wod_response(etag=None):
+    """GET the CrossFit WOD page, revalidating with If-None-Match when an ETag is known.
     
+    Returns (response, html); html is None when the server answers 304 Not Modified.
+    """
+    headers = {'If-None-Match': etag} if etag else None
     try:
-        # Find the date (like "251130")
-        date_elements = soup.find_all(['h1', 'h2'], string=lambda text: text and len(text) == 6 and text.isdigit())
-        date_str = date_elements[0].get_text(strip=True) if date_elements else "Unknown Date"
+        response = _SESSION.get(config.CROSSFIT_URL, headers=headers, timeout=10, stream=True)
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError:
+            response.close()  # Streamed, so the pooled connection isn't released until closed
+            raise
         
-        # Look for workout content - it's usually after "WORKOUT OF THE DAY" heading
-        workout_content = ""
+        if response.status_code == 304:
+            response.close()
+            logger.info(f"WOD page not modified since last fetch: {config.CROSSFIT_URL}")
+            return response, None
         
-        # Expanded workout patterns to catch more variations
-        workout_patterns = [
-            "For time:", "AMRAP", "Rest Day", "Recovery Day", "Active Recovery",
-            "rounds for time", "rounds of:", "EMOM", "Tabata", "Every minute on the minute",
-            "As many rounds as possible", "As many reps as possible", "Death by",
-            "For load:", "Heavy single", "Work up to", "Find your"
-        ]
+        html = _read_wod_body(response)
+    except requests.exceptions.RetryError as e:
+        logger.error(f"Failed to fetch WOD page after {_RETRY.total} retries: {e}")
+        raise
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Failed to fetch WOD page: {e}")
+        raise
+    
+    # Basic content validation
+    if len(html) < 1000:
+        logger.warning(f"Response seems too short ({len(html)} chars), might be blocked")
+    
+    logger.info(f"Successfully fetched WOD page: {config.CROSSFIT_URL}")
+    return response, html
+
+def fetch_wod_html():
+    """Fetch the HTML content from CrossFit WOD page (retries handled by the session adapter).
+    
+    The returned document is truncated right after the closing </main> tag; anything
+    following the main content region is never downloaded.
+    """
+    return _fetch_wod_response()[1]
+
+def _keyword_matcher(keywords):
+    """Build a case-insensitive multi-keyword search backed by one Aho-Corasick automaton.
+    
+    The returned function gives the first keyword found in a text, or None.
+    """
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        automaton.add_word(keyword.lower(), keyword)
+    automaton.make_automaton()
+    
+    def search(text):
+        for _, keyword in automaton.iter(text.lower()):
+            return keyword
+        return None
+    
+    return search
+
+# Expanded workout patterns to catch more variations
+WORKOUT_PATTERNS = [
+    "For time:", "AMRAP", "Rest Day", "Recovery Day", "Active Recovery",
+    "rounds for time", "rounds of:", "EMOM", "Tabata", "Every minute on the minute",
+    "As many rounds as possible", "As many reps as possible", "Death by",
+    "For load:", "Heavy single", "Work up to", "Find your"
+]
+REST_PATTERNS = [
+    "rest day", "no workout", "recovery day", "active recovery",
+    "take a rest", "day off", "recovery", "mobility day"
+]
+
+_find_workout = _keyword_matcher(WORKOUT_PATTERNS)
+_find_rest = _keyword_matcher(REST_PATTERNS)
+_find_rest_word = _keyword_matcher(["rest", "recovery", "off"])
+_find_scaled_stop = _keyword_matcher(['comment', 'coaching', 'resources', 'post time', 'beginner option', 'intermediate option'])
+_find_scaled_content = _keyword_matcher(['for time:', 'amrap', 'pull-ups', 'push-ups', 'squats', 'sit-ups', 'ring rows', 'knee'])
+_find_exercise = _keyword_matcher(['pull-ups', 'push-ups', 'squats', 'sit-ups', 'ring rows'])
+_find_scaling_hint = _keyword_matcher(['reduce', 'jumping', 'knee', 'ring rows', 'modify', 'substitute', 'complexity'])
+_find_option = _keyword_matcher(['intermediate option:', 'beginner option:'])
+_DATE_RE = re.compile(r'\d{6}')
+_SCALING_HEADER_RE = re.compile(r'\s*scaling:\s*', re.IGNORECASE)
+
+# Rest-day pages are recognised from the raw HTML so they can skip BeautifulSoup entirely
+_REST_MARKERS = ('rest day', 'recovery day', 'active recovery')
+_find_rest_marker = _keyword_matcher(_REST_MARKERS)
+_find_training = _keyword_matcher([p for p in WORKOUT_PATTERNS if p.lower() not in _REST_MARKERS])
+_SOLE_TEXT_RE = re.compile(r'<(h[12]|p|div|section|article|li)\b[^>]*>([^<]*)</\1\s*>', re.IGNORECASE)
+_DATE_HEADING_RE = re.compile(r'<h[12]\b[^>]*>(\d{6})</h[12]\s*>', re.IGNORECASE)
+# Same, but also allowing wrapper tags/whitespace around the digits; used to spot headings
+# the soup would read (via .string) that the plain pattern above would skip
+_LOOSE_DATE_HEADING_RE = re.compile(r'<h[12]\b[^>]*>(?:\s*<[^>]*>)*\s*\d{6}', re.IGNORECASE)
+_COMMENT_RE = re.compile(r'<!--.*?-->', re.DOTALL)
+# Elements whose content the soup treats as raw text rather than markup
+_RAW_TEXT_TAG_RE = re.compile(r'<(?:script|style|template|textarea)\b', re.IGNORECASE)
+
+def _parse_rest_day(html):
+    """Parse an unambiguous rest-day page straight from the raw HTML.
+    
+    Returns None (fall back to the full parse) unless the page has a rest marker, no training
+    keywords anywhere, a plain date heading outside comments, and the first rest marker is text
+    content (not an attribute or comment) that makes up the whole text of its element. Pages with
+    an entity or a script/style/template/textarea before the marker or date also fall back, since
+    the raw scan can't see encoded markers or tell raw text from markup.
+    """
+    lowered = html.lower()
+    positions = [i for i in (lowered.find(marker) for marker in _REST_MARKERS) if i != -1]
+    if not positions or _find_training(lowered):
+        return None
+    
+    first = min(positions)
+    if '&' in html[:first] or _RAW_TEXT_TAG_RE.search(html, 0, first):
+        return None  # An encoded marker could come earlier, or the marker may sit in raw text
+    start = html.rfind('<', 0, first)
+    if start == -1 or html.rfind('>', 0, first) < start:
+        return None  # Inside a tag, e.g. an attribute value
+    if lowered.rfind('<!--', 0, first) > lowered.rfind('-->', 0, first):
+        return None  # Inside a comment
+    text_match = _SOLE_TEXT_RE.match(html, start)
+    if not text_match or '>' in text_match.group(2):
+        return None  # Not the element's whole text, or a '>' in an attribute threw the boundaries off
+    
+    uncommented = _COMMENT_RE.sub('', html) if '<!--' in html else html
+    date_match = _DATE_HEADING_RE.search(uncommented)
+    if not date_match or _RAW_TEXT_TAG_RE.search(uncommented, 0, date_match.start()):
+        return None
+    if _LOOSE_DATE_HEADING_RE.search(uncommented).start() != date_match.start():
+        return None
+    
+    date_str = date_match.group(1)
+    parsed_wod = {
+        "date": date_str,
+        "formatted_date": format_date(date_str),
+        "is_rest_day": True,
+        "workout": unescape(text_match.group(2)).strip(),
+        "scaled_options": None,
+        "raw_url": config.CROSSFIT_URL
+    }
+    
+    logger.info(f"Successfully parsed rest day WOD for {parsed_wod['formatted_date']}")
+    return parsed_wod
+
+# Strings in the tree that aren't page text
+_NON_TEXT_STRINGS = (Comment, Declaration, Doctype, ProcessingInstruction)
+
+def _element_text(element, text):
+    """Return an element's text, keeping line breaks when they add structure."""
+    full_text = element.get_text(separator='\n', strip=True)
+    return full_text if len(full_text) > len(text) else text
+
+def make_soup(html):
+    """Build the soup parse_wod works on, e.g. to parse the same HTML repeatedly."""
+    return BeautifulSoup(html, 'lxml')
+
+def parse_wod(html_or_soup):
+    """Parse the WOD content from HTML, or from a soup already built with make_soup()."""
+    if isinstance(html_or_soup, BeautifulSoup):
+        soup = html_or_soup
+    else:
+        # Raw-HTML rest-day shortcut only applies to decoded text; bytes go straight to the soup
+        rest_day_wod = _parse_rest_day(html_or_soup) if isinstance(html_or_soup, str) else None
+        if rest_day_wod:
+            return rest_day_wod
+        soup = make_soup(html_or_soup)
+    
+    # get_text() re-walks the whole subtree, so memoize it per element for this parse
+    text_cache = {}
+    def _text(element):
+        text = text_cache.get(id(element))
+        if text is None:
+            text = text_cache[id(element)] = element.get_text(strip=True)
+        return text
+    
+    try:
+        # Walk the tree once, collecting the date heading (like "251130"), the first
+        # workout string and the scaling markers in document order
+        date_str = None
+        workout_string = None
+        option_elements = {'intermediate option:': None, 'beginner option:': None}
+        scaling_element = None
         
-        # Find main workout section with better content extraction
-        workout_sections = soup.find_all(string=lambda text: text and any(pattern.lower() in text.lower() for pattern in workout_patterns))
+        for node in soup.descendants:
+            if isinstance(node, Tag):
+                if date_str is None and node.name in ('h1', 'h2'):
+                    text = node.string
+                    if text and _DATE_RE.fullmatch(text):
+                        date_str = str(text)
+                continue
+            if isinstance(node, _NON_TEXT_STRINGS):
+                continue  # Comments etc. never show up in get_text(), so they can't hold the workout
+            
+            if workout_string is None and _find_workout(node):
+                workout_string = node
+            if _find_option(node):
+                lowered = node.lower()
+                for option_type, element in option_elements.items():
+                    if element is None and option_type in lowered:
+                        option_elements[option_type] = node
+            elif scaling_element is None and _SCALING_HEADER_RE.fullmatch(node):
+                scaling_element = node
+            
+            if date_str and workout_string and scaling_element and all(option_elements.values()):
+                break
         
-        if workout_sections:
-            # Get the workout details - try to get full workout content
-            for section in workout_sections:
-                parent = section.parent
-                if parent:
-                    # Try to get the full workout content from parent elements
-                    current = parent
-                    content_parts = []
-                    
-                    # Look for container with full workout
-                    while current and len(content_parts) < 10:  # Prevent infinite loops
-                        text = current.get_text(strip=True) if hasattr(current, 'get_text') else str(current).strip()
-                        if text and any(pattern.lower() in text.lower() for pattern in workout_patterns):
-                            # Try to get more complete content
-                            if hasattr(current, 'get_text'):
-                                full_text = current.get_text(separator='\n', strip=True)
-                                if len(full_text) > len(text):
-                                    content_parts.append(full_text)
-                                else:
-                                    content_parts.append(text)
-                            else:
-                                content_parts.append(text)
-                            break
-                        current = current.next_sibling
-                    
-                    if content_parts:
-                        workout_content = "\n".join(content_parts)
-                        break
+        date_str = date_str or "Unknown Date"
         
-        # If we couldn't find workout content, look for it in a different way
-        if not workout_content:
-            # Look for common workout patterns in various elements
+        # Workout content is the element holding the first workout string
+        workout_content = ""
+        if workout_string is not None and workout_string.parent:
+            parent = workout_string.parent
+            workout_content = _element_text(parent, _text(parent))
+        else:
+            # Pattern split across several strings (e.g. "For <b>time:</b>") - match on element text
             for element in soup.find_all(['p', 'div', 'section', 'article']):
-                text = element.get_text(strip=True)
-                if any(pattern.lower() in text.lower() for pattern in workout_patterns):
-                    # Try to get more complete workout text
-                    full_text = element.get_text(separator='\n', strip=True)
-                    workout_content = full_text if len(full_text) > len(text) else text
+                text = _text(element)
+                if _find_workout(text):
+                    workout_content = _element_text(element, text)
                     break
         
         # Check if it's a rest day - improved pattern matching
-        rest_patterns = [
-            "rest day", "no workout", "recovery day", "active recovery",
-            "take a rest", "day off", "recovery", "mobility day"
-        ]
-        rest_day = any(pattern in workout_content.lower() for pattern in rest_patterns) if workout_content else False
+        rest_day = bool(workout_content and _find_rest(workout_content))
         
         # Additional check: if workout content is very short and contains rest-like words
         if not rest_day and workout_content and len(workout_content.strip()) < 50:
-            rest_day = any(word in workout_content.lower() for word in ["rest", "recovery", "off"])
+            rest_day = bool(_find_rest_word(workout_content))
         
         # Look for scaled/beginner versions - target official CrossFit scaling sections
         scaled_content = ""
         scaling_sections = []
         
-        # Look for official intermediate and beginner options
-        for option_type in ['intermediate option:', 'beginner option:']:
-            option_element = soup.find(string=lambda text: text and option_type in text.lower())
-            if option_element:
-                # Collect the workout details that follow
-                workout_parts = [option_type.title().replace(':', '')]
-                current = option_element.parent
-                
-                # Look through subsequent elements to build the complete workout
-                for _ in range(15):  # Check more elements
-                    if current and current.next_sibling:
-                        current = current.next_sibling
-                        if hasattr(current, 'get_text'):
-                            text = current.get_text(strip=True)
+        # Explicit rest days never have scaled variants, so skip the scaling walks entirely.
+        # Gate on the strict markers only: rest_day also fires on e.g. "1 min recovery between".
+        if not _find_rest_marker(workout_content):
+            # Look for official intermediate and beginner options
+            for option_type, option_element in option_elements.items():
+                if option_element:
+                    # Collect the workout details that follow
+                    workout_parts = [option_type.title().replace(':', '')]
+                    # Look through subsequent elements to build the complete workout
+                    for sibling in islice(option_element.parent.next_siblings, 15):  # Check more elements
+                        if hasattr(sibling, 'get_text'):
+                            text = _text(sibling)
                             if text:
                                 # Stop at comments, coaching, or next option
-                                if any(stop in text.lower() for stop in ['comment', 'coaching', 'resources', 'post time', 'beginner option', 'intermediate option']):
+                                if _find_scaled_stop(text):
                                     break
-                                    
+                                
                                 # Add workout content - be more permissive with numbers and exercise names
-                                if any(word in text.lower() for word in ['for time:', 'amrap', 'pull-ups', 'push-ups', 'squats', 'sit-ups', 'ring rows', 'knee']) or text.isdigit():
+                                if _find_scaled_content(text) or text.isdigit():
                                     workout_parts.append(text)
                 
-                if len(workout_parts) > 1:
-                    # Format the workout nicely
-                    formatted_workout = []
-                    current_exercise = ""
+                    if len(workout_parts) > 1:
+                        # Format the workout nicely
+                        formatted_workout = []
+                        current_exercise = ""
                     
-                    for part in workout_parts[1:]:  # Skip the title
-                        if part.isdigit():
-                            current_exercise = part + " "
-                        elif current_exercise and any(ex in part.lower() for ex in ['pull-ups', 'push-ups', 'squats', 'sit-ups', 'ring rows']):
-                            formatted_workout.append(current_exercise + part)
-                            current_exercise = ""
-                        else:
-                            formatted_workout.append(part)
+                        for part in workout_parts[1:]:  # Skip the title
+                            if part.isdigit():
+                                current_exercise = part + " "
+                            elif current_exercise and _find_exercise(part):
+                                formatted_workout.append(current_exercise + part)
+                                current_exercise = ""
+                            else:
+                                formatted_workout.append(part)
                     
-                    if formatted_workout:
-                        scaling_sections.append(workout_parts[0] + ":\n" + "\n".join(formatted_workout))
+                        if formatted_workout:
+                            scaling_sections.append(workout_parts[0] + ":\n" + "\n".join(formatted_workout))
         
-        # Also look for general scaling guidance
-        scaling_element = soup.find(string=lambda text: text and text.strip().lower() == 'scaling:')
-        if scaling_element:
-            current = scaling_element.parent
-            scaling_guidance = []
+            # Also look for general scaling guidance
+            if scaling_element:
+                scaling_guidance = []
             
-            # Collect scaling guidance
-            for _ in range(8):
-                if current and current.next_sibling:
-                    current = current.next_sibling
-                    if hasattr(current, 'get_text'):
-                        text = current.get_text(strip=True)
+                # Collect scaling guidance
+                for sibling in islice(scaling_element.parent.next_siblings, 8):
+                    if hasattr(sibling, 'get_text'):
+                        text = _text(sibling)
                         if text and len(text) > 20:
                             # Stop at options
                             if 'option:' in text.lower():
                                 break
-                            if any(word in text.lower() for word in ['reduce', 'jumping', 'knee', 'ring rows', 'modify', 'substitute', 'complexity']):
+                            if _find_scaling_hint(text):
                                 scaling_guidance.append(text)
                                 if len(scaling_guidance) >= 3:  # Got enough guidance
                                     break
             
-            if scaling_guidance:
-                scaling_sections.insert(0, 'Scaling Guidance:\n' + '\n'.join(scaling_guidance))
+                if scaling_guidance:
+                    scaling_sections.insert(0, 'Scaling Guidance:\n' + '\n'.join(scaling_guidance))
         
         # Format the scaling content
         if scaling_sections:
@@ -195,7 +366,7 @@ def parse_wod(html):
             "is_rest_day": rest_day,
             "workout": workout_content.strip() if workout_content else "Workout details not found",
             "scaled_options": scaled_content.strip() if scaled_content else None,
-            "raw_url": CROSSFIT_URL
+            "raw_url": config.CROSSFIT_URL
         }
         
         logger.info(f"Successfully parsed WOD for {parsed_wod['formatted_date']}")
@@ -209,9 +380,12 @@ def parse_wod(html):
             "is_rest_day": False,
             "workout": f"Error parsing workout: {str(e)}",
             "scaled_options": None,
-            "raw_url": CROSSFIT_URL
+            "raw_url": config.CROSSFIT_URL
         }
 
+# Longest possible month lengths; Feb 29 is checked against the leap-year rule separately
+_DAYS_IN_MONTH = (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
 def format_date(date_str):
     """Convert date string like '251130' to '2025-11-30'."""
     try:
@@ -225,29 +399,53 @@ def format_date(date_str):
             # Could be improved with logic like: if year < 50: 2000+year else 1900+year
             year = 2000 + year_2digit if year_2digit < 100 else year_2digit
             
-            # Validate date ranges
-            if not (1 <= month <= 12 and 1 <= day <= 31):
+            # Validate date ranges (catches Feb 30, etc.)
+            if not (1 <= month <= 12 and 1 <= day <= _DAYS_IN_MONTH[month - 1]):
                 logger.warning(f"Invalid date components: month={month}, day={day}")
                 return datetime.now().strftime("%Y-%m-%d")
             
-            # Try to create actual date to validate (catches Feb 30, etc.)
-            try:
-                datetime(year, month, day)
-                return f"{year:04d}-{month:02d}-{day:02d}"
-            except ValueError as e:
-                logger.warning(f"Invalid date {year}-{month}-{day}: {e}")
+            # Feb 29 only exists in leap years
+            if month == 2 and day == 29 and not (year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)):
+                logger.warning(f"Invalid date {year}-{month}-{day}: not a leap year")
                 return datetime.now().strftime("%Y-%m-%d")
+            
+            return f"{year:04d}-{month:02d}-{day:02d}"
         else:
             return datetime.now().strftime("%Y-%m-%d")
     except Exception as e:
         logger.error(f"Date formatting error: {e}")
         return datetime.now().strftime("%Y-%m-%d")
 
-def get_todays_wod():
-    """Main function to get today's WOD."""
+def _is_complete_wod(wod):
+    """True when a parse found both a date and a workout, i.e. it is worth caching."""
+    return wod['date'] not in ("Unknown Date", "Error") and wod['workout'] != "Workout details not found"
+
+def get_todays_wod(html=None):
+    """Main function to get today's WOD.
+    
+    Pass already-fetched page HTML to parse it instead of downloading the page again;
+    the result is not cached.
+    """
+    if html is not None:
+        return parse_wod(html)
+    
+    key = datetime.now().strftime("%Y-%m-%d")
+    cached = _WOD_CACHE.get(key)
+    if cached and time.time() - cached[0] < WOD_CACHE_TTL:
+        return cached[2]
+    
     try:
-        html = fetch_wod_html()
-        wod = parse_wod(html)
+        response, html = _fetch_wod_response(etag=cached[1] if cached else None)
+        if cached and html is None:
+            etag, wod = response.headers.get('ETag', cached[1]), cached[2]
+        else:
+            etag, wod = response.headers.get('ETag'), parse_wod(html)
+        
+        # Don't let a blocked/short page or a parse error stick around for the whole TTL
+        if _is_complete_wod(wod):
+            if not cached:
+                _WOD_CACHE.clear()  # Only today's entry is ever useful
+            _WOD_CACHE[key] = (time.time(), etag, wod)
         return wod
     except Exception as e:
         logger.error(f"Failed to get today's WOD: {e}")
@@ -258,7 +456,7 @@ def get_todays_wod():
             "is_rest_day": False,
             "workout": "Unable to fetch today's WOD. Try this fallback: 5 rounds of 400m run, 20 air squats, 10 push-ups.",
             "scaled_options": "Scaled: 3 rounds of 200m walk, 15 air squats, 5 knee push-ups.",
-            "raw_url": CROSSFIT_URL
+            "raw_url": config.CROSSFIT_URL
         }
 
 if __name__ == "__main__":
@@ -4,9 +4,48 @@ Test script for WodBot components
 """
 
 import sys
+import time
+import logging
 import traceback
-from scraper import fetch_wod_html, parse_wod, get_todays_wod, format_date
-from config import validate_config, CROSSFIT_URL
+import requests
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from scraper import fetch_wod_html, parse_wod, get_todays_wod, format_date, make_soup, _parse_rest_day, _read_wod_body
+import config
+import scraper
+from config import validate_config
+
+# Today's WOD, fetched and parsed at most once per test run
+_todays_wod = None
+
+def _get_todays_wod(wod=None):
+    """Return today's WOD, reusing an already-parsed one or the result from earlier tests in this run."""
+    global _todays_wod
+    if _todays_wod is None:
+        _todays_wod = wod if wod is not None else get_todays_wod()
+    return _todays_wod
+
+# Mock pages for test_workout_scenarios, parsed into soups once at import so repeated runs reuse them
+SCENARIOS = [
+    {
+        "name": "Regular AMRAP",
+        "html": "<div><h2>251201</h2><p>AMRAP 12 minutes: 5 pull-ups, 10 push-ups, 15 squats</p><p>Scaled: Assisted pull-ups, knee push-ups</p></div>"
+    },
+    {
+        "name": "For Time Workout", 
+        "html": "<div><h1>251202</h1><p>For time: 21-15-9 Burpees and Box Jumps</p><p>Beginner: Step-ups instead of box jumps</p></div>"
+    },
+    {
+        "name": "Rest Day",
+        "html": "<div><h1>251203</h1><p>Rest Day - Focus on mobility and recovery</p></div>"
+    },
+    {
+        "name": "EMOM Workout",
+        "html": "<div><h2>251204</h2><p>EMOM 10: 3 deadlifts at 80%</p><p>Scaled: Use lighter weight, focus on form</p></div>"
+    }
+]
+for _scenario in SCENARIOS:
+    _scenario['soup'] = make_soup(_scenario['html'])
 
 def test_date_formatting():
     """Test the date formatting function."""
@@ -18,9 +57,38 @@ def test_date_formatting():
         "invalid", # Invalid date
     ]
     
-    for date_str in test_cases:
-        formatted = format_date(date_str)
-        print(f"  {date_str} -> {formatted}")
+    results = [(date_str, format_date(date_str)) for date_str in test_cases]
+    sys.stdout.write('\n'.join(f"  {date_str} -> {formatted}" for date_str, formatted in results) + '\n\n')
+
+def test_date_formatting_stress():
+    """Check format_date against datetime over every YYMMDD combination."""
+    print("📆 Stress testing date formatting...")
+    date_strs = [f"{y:02d}{m:02d}{d:02d}" for y in range(100) for m in range(1, 13) for d in range(1, 32)]
+    
+    def expected(date_str):
+        try:
+            return datetime(2000 + int(date_str[:2]), int(date_str[2:4]), int(date_str[4:])).strftime("%Y-%m-%d")
+        except ValueError:
+            return datetime.now().strftime("%Y-%m-%d")
+    
+    # Invalid dates (Feb 30, Apr 31, ...) each log a warning; keep the output readable
+    scraper_logger = logging.getLogger('scraper')
+    previous_level = scraper_logger.level
+    scraper_logger.setLevel(logging.ERROR)
+    try:
+        start = time.perf_counter()
+        results = [format_date(date_str) for date_str in date_strs]
+        elapsed = time.perf_counter() - start
+    finally:
+        scraper_logger.setLevel(previous_level)
+    
+    mismatches = [(d, r) for d, r in zip(date_strs, results) if r != expected(d)]
+    print(f"  ⏱️  {len(date_strs)} dates in {elapsed * 1000:.1f} ms ({elapsed / len(date_strs) * 1e6:.2f} µs/date)")
+    if mismatches:
+        print(f"  ❌ {len(mismatches)} mismatches, e.g. {mismatches[:3]}")
+    else:
+        print(f"  ✅ All dates match datetime validation")
+    assert not mismatches, f"format_date disagrees with datetime for {len(mismatches)} dates"
     print()
 
 def test_html_fetching():
@@ -29,12 +97,119 @@ def test_html_fetching():
     try:
         html = fetch_wod_html()
         print(f"  ✅ Successfully fetched HTML ({len(html)} characters)")
-        print(f"  📄 URL: {CROSSFIT_URL}")
+        print(f"  📄 URL: {config.CROSSFIT_URL}")
         return html
     except Exception as e:
         print(f"  ❌ Failed to fetch HTML: {e}")
         return None
 
+class _FakeStreamResponse:
+    """Minimal stand-in for a streamed requests.Response."""
+    def __init__(self, body, status_code=200, headers=None):
+        self.body = body
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.chunks_read = 0
+        self.closed = False
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error", response=self)
+    
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            self.chunks_read += 1
+            yield self.body[i:i + chunk_size]
+    
+    def close(self):
+        self.closed = True
+
+def test_streamed_body_truncation():
+    """Test that streamed pages are cut after </main> and only there."""
+    print("✂️  Testing streamed body truncation...")
+    page = b"<html><head><title>WOD</title></head><body><main><h1>251130</h1><p>For time: run</p></main><footer>" + b"x" * 50000 + b"</footer></body></html>"
+    
+    # Closing tag split across two chunks
+    split_at = page.index(b"</main>") + 3
+    response = _FakeStreamResponse(page)
+    html = _read_wod_body(response, chunk_size=split_at)
+    assert html.endswith("<p>For time: run</p></main>"), html[-40:]
+    assert response.closed and response.chunks_read == 2
+    print("  ✅ Marker straddling a chunk boundary is found")
+    
+    # A </main> before the main region (e.g. in a <head> script template) must not truncate
+    early = page.replace(b"<title>WOD</title>", b'<script>tpl="</main>"</script>')
+    html = _read_wod_body(_FakeStreamResponse(early), chunk_size=16)
+    assert html.endswith("<p>For time: run</p></main>"), html[-40:]
+    print("  ✅ Early </main> before <main> is ignored")
+    
+    # No main region at all: read everything
+    no_main = page.replace(b"<main>", b"<div>").replace(b"</main>", b"</div>")
+    assert _read_wod_body(_FakeStreamResponse(no_main)) == no_main.decode()
+    print("  ✅ Pages without <main> are read in full")
+    
+    # Error statuses must still release the streamed connection
+    not_found = _FakeStreamResponse(b"Not Found", status_code=404)
+    original_get = scraper._SESSION.get
+    scraper._SESSION.get = lambda url, **kwargs: not_found
+    try:
+        fetch_wod_html()
+        assert False, "404 should raise"
+    except requests.exceptions.HTTPError:
+        pass
+    finally:
+        scraper._SESSION.get = original_get
+    assert not_found.closed
+    print("  ✅ Error responses are closed")
+    print()
+
+def test_todays_wod_cache():
+    """Test get_todays_wod's TTL cache, ETag revalidation and refusal to cache bad parses."""
+    print("🗄️  Testing today's WOD cache...")
+    page = b"<html><body><main><h1>251130</h1><p>For time: 21-15-9 thrusters</p></main></body></html>"
+    responses = []
+    requests_sent = []
+    
+    def fake_get(url, headers=None, **kwargs):
+        requests_sent.append(headers)
+        return responses.pop(0)
+    
+    original_get = scraper._SESSION.get
+    scraper._SESSION.get = fake_get
+    scraper._WOD_CACHE.clear()
+    try:
+        # Incomplete parse (blocked page) is returned but not cached
+        responses.append(_FakeStreamResponse(b"<html>blocked</html>", headers={'ETag': '"blocked"'}))
+        wod = get_todays_wod()
+        assert wod['workout'] == "Workout details not found" and not scraper._WOD_CACHE
+        print("  ✅ Incomplete parse is not cached")
+        
+        # A stale entry from another day is dropped when a fresh page is cached
+        scraper._WOD_CACHE["2000-01-01"] = (time.time(), None, wod)
+        responses.append(_FakeStreamResponse(page, headers={'ETag': '"v1"'}))
+        wod = get_todays_wod()
+        assert wod['date'] == '251130' and list(scraper._WOD_CACHE) == [datetime.now().strftime("%Y-%m-%d")]
+        print("  ✅ Complete parse is cached (old days cleared)")
+        
+        # Within the TTL: no request at all
+        sent = len(requests_sent)
+        assert get_todays_wod() is wod and len(requests_sent) == sent
+        print("  ✅ TTL hit skips the network")
+        
+        # Expired: revalidate with If-None-Match; 304 reuses the parse and refreshes the ETag
+        key, (_, etag, cached_wod) = next(iter(scraper._WOD_CACHE.items()))
+        scraper._WOD_CACHE[key] = (time.time() - scraper.WOD_CACHE_TTL - 1, etag, cached_wod)
+        not_modified = _FakeStreamResponse(b"", status_code=304, headers={'ETag': '"v2"'})
+        responses.append(not_modified)
+        assert get_todays_wod() is wod
+        assert requests_sent[-1] == {'If-None-Match': '"v1"'} and not_modified.closed
+        assert scraper._WOD_CACHE[key][1] == '"v2"' and time.time() - scraper._WOD_CACHE[key][0] < 5
+        print("  ✅ Expired entry revalidates via 304 and refreshes the ETag")
+    finally:
+        scraper._SESSION.get = original_get
+        scraper._WOD_CACHE.clear()
+    print()
+
 def test_parsing(html=None):
     """Test parsing of WOD content."""
     print("🔍 Testing WOD parsing...")
@@ -101,53 +276,103 @@ def test_scaled_workout_parsing():
         print(f"  ❌ Scaled parsing test failed: {e}")
         return False
 
+def test_comment_markers_ignored():
+    """Test that workout, option and scaling markers inside HTML comments are ignored."""
+    print("💬 Testing markers inside comments...")
+    html = """
+    <!DOCTYPE html>
+    <div><!-- AMRAP template --><h1>251130</h1></div>
+    <div><p>For time: 21-15-9 thrusters</p></div>
+    <div><!-- Intermediate Option: --><!-- Scaling: --><p>For time: 15 pull-ups</p></div>
+    """
+    wod = parse_wod(html)
+    assert wod['date'] == '251130', wod
+    assert wod['workout'] == 'For time: 21-15-9 thrusters', wod
+    assert wod['scaled_options'] is None, wod
+    print(f"  ✅ Workout taken from page text: {wod['workout']}")
+    print()
+
 def test_workout_scenarios():
     """Test various workout scenario parsing."""
     print("🎯 Testing workout scenarios...")
     
-    scenarios = [
-        {
-            "name": "Regular AMRAP",
-            "html": "<div><h2>251201</h2><p>AMRAP 12 minutes: 5 pull-ups, 10 push-ups, 15 squats</p><p>Scaled: Assisted pull-ups, knee push-ups</p></div>"
-        },
-        {
-            "name": "For Time Workout", 
-            "html": "<div><h1>251202</h1><p>For time: 21-15-9 Burpees and Box Jumps</p><p>Beginner: Step-ups instead of box jumps</p></div>"
-        },
-        {
-            "name": "Rest Day",
-            "html": "<div><h1>251203</h1><p>Rest Day - Focus on mobility and recovery</p></div>"
-        },
-        {
-            "name": "EMOM Workout",
-            "html": "<div><h2>251204</h2><p>EMOM 10: 3 deadlifts at 80%</p><p>Scaled: Use lighter weight, focus on form</p></div>"
-        }
-    ]
-    
-    for scenario in scenarios:
+    def parse_scenario(scenario):
         try:
-            print(f"\n  Testing: {scenario['name']}")
-            wod = parse_wod(scenario['html'])
-            
-            print(f"    Date: {wod['formatted_date']}")
-            print(f"    Rest Day: {wod['is_rest_day']}")
-            print(f"    Workout: {wod['workout'][:60]}...")
-            
-            if wod.get('scaled_options'):
-                print(f"    Scaled: {wod['scaled_options'][:60]}...")
-            else:
-                print(f"    Scaled: None")
-                
+            return scenario['name'], parse_wod(scenario['soup']), None
         except Exception as e:
-            print(f"    ❌ Failed {scenario['name']}: {e}")
+            return scenario['name'], None, e
+    
+    # Scenarios are independent, so parse them concurrently and report in order
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(parse_scenario, SCENARIOS))
+    
+    for name, wod, error in results:
+        print(f"\n  Testing: {name}")
+        if error:
+            print(f"    ❌ Failed {name}: {error}")
+            continue
+        
+        print(f"    Date: {wod['formatted_date']}")
+        print(f"    Rest Day: {wod['is_rest_day']}")
+        print(f"    Workout: {wod['workout'][:60]}...")
+        
+        if wod.get('scaled_options'):
+            print(f"    Scaled: {wod['scaled_options'][:60]}...")
+        else:
+            print(f"    Scaled: None")
     
     print(f"  ✅ Workout scenario testing complete")
 
-def test_data_structure():
+def test_scenarios_html_matches_soup():
+    """Test that parsing a scenario's HTML string gives the same WOD as its prebuilt soup."""
+    print("🔁 Testing HTML vs soup parsing of scenarios...")
+    for scenario in SCENARIOS:
+        from_html = parse_wod(scenario['html'])
+        from_soup = parse_wod(scenario['soup'])
+        assert from_html == from_soup, f"{scenario['name']}: {from_html} != {from_soup}"
+        print(f"  ✅ {scenario['name']}")
+    print()
+
+def test_rest_day_fast_path():
+    """Test that the raw-HTML rest-day shortcut agrees with the full soup parse."""
+    print("😴 Testing rest-day fast path...")
+    
+    # Plain rest-day pages: the shortcut must fire and match the full parse
+    rest_pages = [
+        "<div><h1>251203</h1><p>Rest Day - Focus on mobility and recovery</p></div>",
+        "<html><body><!-- nav --><h1>251207</h1><section><p>Rest Day</p></section><p>Take a break today</p></body></html>",
+        "<html><body><main><h2 class='date'>251214</h2><div>Active Recovery &amp; Mobility</div></main></body></html>",
+    ]
+    # Ambiguous pages: the shortcut must either bail out or still match the full parse
+    ambiguous_pages = [
+        '<h1>251203</h1><div data-note="rest day">Hello there</div>',
+        '<!-- <h1>240101</h1> --><h1>251203</h1><p>Rest Day</p>',
+        '<h1><span>240101</span></h1><h1>251203</h1><p>Rest Day</p>',
+        '<!-- Rest Day --><h1>251203</h1><p>Rest Day</p>',
+        '<h1>251203</h1><p>Rest Day</p><p>For time: 400m run</p>',
+        '<h1>251203</h1><p>Rest&#32;Day</p><p>Active Recovery</p>',
+        "<script>x='<p>Rest Day</p>'</script><h1>251203</h1><div>Active Recovery</div>",
+        "<h1>251203</h1><script>x='<p>Rest Day</p>'</script><div>Active Recovery</div>",
+        "<p>Rest Day</p><script>x='<h1>240101</h1>'</script><h1>251203</h1>",
+    ]
+    
+    for html in rest_pages + ambiguous_pages:
+        fast = _parse_rest_day(html)
+        full = parse_wod(make_soup(html))
+        if html in rest_pages:
+            assert fast is not None, f"Shortcut did not fire for {html!r}"
+        assert fast is None or fast == full, f"Shortcut {fast} != full parse {full} for {html!r}"
+    
+    # Bytes skip the shortcut and still parse
+    assert parse_wod(rest_pages[0].encode())['is_rest_day'] is True
+    print(f"  ✅ Fast path matches the full parse on {len(rest_pages) + len(ambiguous_pages)} pages")
+    print()
+
+def test_data_structure(wod=None):
     """Test that returned data has correct structure."""
     print("🏗️  Testing data structure...")
     try:
-        wod = get_todays_wod()
+        wod = _get_todays_wod(wod)
         
         # Check required fields
         required_fields = ['date', 'formatted_date', 'is_rest_day', 'workout', 'scaled_options', 'raw_url']
@@ -167,11 +392,11 @@ def test_data_structure():
     except Exception as e:
         print(f"  ❌ Data structure test failed: {e}")
 
-def test_full_workflow():
-    """Test the complete workflow."""
+def test_full_workflow(html=None):
+    """Test the complete workflow through get_todays_wod (reusing an already-fetched page if given)."""
     print("🚀 Testing complete workflow...")
     try:
-        wod = get_todays_wod()
+        wod = get_todays_wod(html)
         print("  ✅ Full workflow successful!")
         print(f"  📊 Result: {wod['formatted_date']} - {'Rest Day' if wod['is_rest_day'] else 'Workout Day'}")
         
@@ -207,12 +432,23 @@ def main():
     
     # Test each component
     test_date_formatting()
+    test_date_formatting_stress()
+    # Fetch and parse the page once and share the result with every test that needs it
+    test_streamed_body_truncation()
+    test_todays_wod_cache()
     html = test_html_fetching()
-    test_parsing(html)
+    wod = None
+    if html is not None:
+        wod = test_parsing(html)
+    else:
+        print("🔍 Skipping WOD parsing (no HTML fetched)\n")
     test_scaled_workout_parsing()
+    test_comment_markers_ignored()
     test_workout_scenarios()
-    test_data_structure()
-    test_full_workflow()
+    test_scenarios_html_matches_soup()
+    test_rest_day_fast_path()
+    test_data_structure(wod)
+    test_full_workflow(html)
     test_config()
     
     print("=" * 50)